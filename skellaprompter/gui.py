@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
-import re
+import logging
+import os
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
+from typing import Callable, Iterator
 
-import yaml
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QCloseEvent
+from PyQt5.QtCore import QObject, QRunnable, Qt, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QCloseEvent, QTextCursor
 from PyQt5.QtWidgets import (
     QApplication,
     QComboBox,
@@ -27,10 +30,47 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
+from .options import cached_options, fresh_options, preload_options, with_default
+from .template import normalize_newlines, scan_tokens
 
-TOKEN_RE = re.compile(
-    r"\{\{(?P<gd>[^{}]+)\}\}|<<(?P<ld>[^<>]+)>>|\[\[\[(?P<long>[^\]]+)\]\]\]|\[\[(?P<short>[^\]]+)\]\]"
-)
+logger = logging.getLogger(__name__)
+
+FOLDER_ROLE = Qt.UserRole + 1
+
+_TEMPLATE_CACHE_MAX = 32
+
+
+def _iter_prompts(root: str) -> Iterator[tuple[tuple[str, ...], str]]:
+    """Yield ``(parts, full_path)`` for every ``.md`` file below ``root``.
+
+    ``parts`` is the path relative to ``root`` split into components. Like
+    ``Path.rglob`` symlinked directories are not descended into.
+    """
+    stack: list[tuple[str, tuple[str, ...]]] = [(root, ())]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, prefix + (entry.name,)))
+                elif entry.name.endswith(".md") and entry.is_file():
+                    yield prefix + (entry.name,), entry.path
+
+
+def _list_prompts(root: str) -> list[tuple[tuple[str, ...], str]]:
+    """Return the results of ``_iter_prompts(root)`` sorted by path parts."""
+    return sorted(_iter_prompts(root))
+
+
+def _qt_len(text: str) -> int:
+    """Length of ``text`` in QString (UTF-16) units, as used by QTextCursor."""
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
 
 
 class Variable:
@@ -46,21 +86,55 @@ class Variable:
         self.widget: QWidget | None = None
 
 
+class _RunnableSignals(QObject):
+    """Signals carrying a background result back to the GUI thread."""
+
+    finished = pyqtSignal(int, object)
+
+
+class JobRunnable(QRunnable):
+    """Run ``fn(*args)`` on the thread pool and emit its result.
+
+    ``signals.finished`` carries ``(generation, result)``; ``result`` is
+    ``None`` if ``fn`` raised.
+    """
+
+    def __init__(self, fn: Callable[..., object], *args: object, generation: int) -> None:
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.generation = generation
+        self.signals = _RunnableSignals()
+
+    def run(self) -> None:
+        try:
+            result = self.fn(*self.args)
+        except Exception:
+            logger.exception("Background job %s failed", self.fn.__name__)
+            result = None
+        self.signals.finished.emit(self.generation, result)
+
+
 class MainWindow(QMainWindow):
     """Main application window."""
 
     def __init__(self, base_path: Path) -> None:
         super().__init__()
         self.base_path = base_path
+        self._prompts_root = base_path / "prompts"
+        self._vars_root = base_path / "vars"
+        self._prompt_vars_root = base_path / "prompt-vars"
         self.setWindowTitle("Skellaprompter")
         self.resize(1000, 600)
 
         self.prompt_tree = QTreeWidget()
         self.prompt_tree.setHeaderHidden(True)
         self.prompt_tree.itemClicked.connect(self.on_tree_clicked)
+        self.prompt_tree.itemExpanded.connect(self._expand_item)
 
         self.prompt_edit = QPlainTextEdit()
         self.prompt_edit.setReadOnly(True)
+        self.prompt_edit.setUndoRedoEnabled(False)
         self.template_edit = QPlainTextEdit()
         self.template_edit.setReadOnly(False)
 
@@ -90,11 +164,38 @@ class MainWindow(QMainWindow):
         splitter.setStretchFactor(1, 1)
 
         self.setCentralWidget(splitter)
-        self.setStatusBar(QStatusBar())
+        self._status_bar = QStatusBar()
+        self.setStatusBar(self._status_bar)
+        self._clipboard = QApplication.clipboard()
 
         self.variables: dict[str, Variable] = {}
+        self._thread_pool = QThreadPool.globalInstance()
+        # Bumped on every resync/build_variables so stale results are dropped.
+        self._scan_generation = 0
+        self._form_generation = 0
+        self._widget_pool: dict[str, list[QWidget]] = {"combo": [], "line": [], "text": []}
         self.template_text: str = ""
         self.template_path: Path | None = None
+        self._template_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # Folder path parts -> (name, full path or None for folders) children.
+        self._tree_index: dict[tuple[str, ...], list[tuple[str, str | None]]] = {}
+        # Template split into N + 1 literals around N variable slots, with a
+        # value getter per slot.
+        self._literals: tuple[str, ...] = ()
+        self._getters: tuple[Callable[[], str], ...] = ()
+        # Per variable slot indices, and their (start, end) in prompt_edit.
+        self._slots_by_name: dict[str, list[int]] = {}
+        self._slot_positions: list[tuple[int, int]] = []
+        # Literal/value parts of the prompt shown in prompt_edit, and their
+        # joined text (None after in-place slot updates until next needed).
+        self._rendered: list[str] = []
+        self._last_rendered: str | None = ""
+        self._dirty_vars: set[str] = set()
+
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setInterval(40)
+        self._render_timer.timeout.connect(self._flush_render)
 
         self.build_menu()
         self.resync()
@@ -108,6 +209,8 @@ class MainWindow(QMainWindow):
         save_action.triggered.connect(self.save_prompt)
         resync_action = file_menu.addAction("Resync")
         resync_action.triggered.connect(self.resync)
+        reload_action = file_menu.addAction("Reload Vars")
+        reload_action.triggered.connect(self.reload_vars)
         file_menu.addSeparator()
         quit_action = file_menu.addAction("Quit")
         quit_action.triggered.connect(self.close)
@@ -129,78 +232,136 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Variable Syntax", text)
 
     def resync(self) -> None:
-        """Rebuild the navigation tree from the prompts directory."""
-        self.prompt_tree.clear()
-        prompts_root = self.base_path / "prompts"
-        for path in sorted(prompts_root.rglob("*.md")):
-            if path.is_file():
-                rel = path.relative_to(prompts_root)
-                parent = self._ensure_parents(rel.parts[:-1])
-                item = QTreeWidgetItem([rel.stem])
-                item.setData(0, Qt.UserRole, path)
-                parent.addChild(item)
-
-    def _ensure_parents(self, parts: tuple[str, ...]) -> QTreeWidgetItem:
-        parent = self.prompt_tree.invisibleRootItem()
-        for part in parts:
-            found = None
-            for i in range(parent.childCount()):
-                child = parent.child(i)
-                if child.text(0) == part:
-                    found = child
-                    break
-            if found is None:
-                found = QTreeWidgetItem([part])
-                parent.addChild(found)
-            parent = found
-        return parent
+        """Rebuild the navigation tree from the prompts directory.
+
+        The directory is scanned on the thread pool and the tree is rebuilt
+        once the results arrive. Only top-level items are created then;
+        folder contents become tree items the first time they are expanded.
+        """
+        self._scan_generation += 1
+        runnable = JobRunnable(
+            _list_prompts, str(self._prompts_root), generation=self._scan_generation
+        )
+        runnable.signals.finished.connect(self._on_scan_finished, Qt.QueuedConnection)
+        self._thread_pool.start(runnable)
+        # Warm the options cache so global combos can be filled immediately.
+        preload = JobRunnable(
+            preload_options, str(self._vars_root), generation=self._scan_generation
+        )
+        self._thread_pool.start(preload)
+
+    def _on_scan_finished(
+        self, generation: int, entries: list[tuple[tuple[str, ...], str]] | None
+    ) -> None:
+        if generation != self._scan_generation or entries is None:
+            return  # superseded by a later resync, or the scan failed
+        tree = self.prompt_tree
+        tree.setUpdatesEnabled(False)
+        tree.blockSignals(True)
+        sorting = tree.isSortingEnabled()
+        tree.setSortingEnabled(False)
+        try:
+            tree.clear()
+            self._tree_index = {(): []}
+            for parts, full_path in entries:
+                children = self._ensure_parents(parts[:-1])
+                children.append((parts[-1][:-3], full_path))
+            self._populate(tree.invisibleRootItem(), ())
+        finally:
+            tree.setSortingEnabled(sorting)
+            tree.blockSignals(False)
+            tree.setUpdatesEnabled(True)
+
+    def reload_vars(self) -> None:
+        """Re-read variable option files for the current template."""
+        self.build_variables()
+        self.render_prompt()
+
+    def _ensure_parents(self, parts: tuple[str, ...]) -> list[tuple[str, str | None]]:
+        children = self._tree_index.get(parts)
+        if children is None:
+            children = self._tree_index[parts] = []
+            self._ensure_parents(parts[:-1]).append((parts[-1], None))
+        return children
+
+    def _populate(self, parent: QTreeWidgetItem, parts: tuple[str, ...]) -> None:
+        items = []
+        for name, full_path in self._tree_index.get(parts, ()):
+            item = QTreeWidgetItem([name])
+            if full_path is None:
+                item.setData(0, FOLDER_ROLE, parts + (name,))
+                item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            else:
+                item.setData(0, Qt.UserRole, full_path)
+            items.append(item)
+        parent.addChildren(items)
+
+    def _expand_item(self, item: QTreeWidgetItem) -> None:
+        parts = item.data(0, FOLDER_ROLE)
+        if parts is None or item.childCount():
+            return
+        self._populate(item, tuple(parts))
 
     # ------------------------------------------------------------------
     # Template loading and variable parsing
 
     def on_tree_clicked(self, item: QTreeWidgetItem) -> None:
-        path = item.data(0, Qt.UserRole)
-        if not path:
+        raw_path = item.data(0, Qt.UserRole)
+        if not raw_path:
+            return
+        path = Path(raw_path)
+        text = self._read_template(raw_path)
+        if path == self.template_path and text == self.template_text:
             return
-        self.template_path = Path(path)
-        self.template_text = self.template_path.read_text(encoding="utf-8")
+        self.template_path = path
+        self.template_text = text
         self.template_edit.setPlainText(self.template_text)
         self.build_variables()
         self.render_prompt()
 
+    def _read_template(self, path: str) -> str:
+        """Return the text of ``path``, reusing the cached copy while unchanged."""
+        mtime = os.stat(path).st_mtime
+        cached = self._template_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            self._template_cache.move_to_end(path)
+            return cached[1]
+        with open(path, encoding="utf-8") as handle:
+            text = handle.read()
+        self._template_cache[path] = (mtime, text)
+        if len(self._template_cache) > _TEMPLATE_CACHE_MAX:
+            self._template_cache.popitem(last=False)
+        return text
+
     def build_variables(self) -> None:
-        # clear existing
-        while self.vars_form.rowCount():
-            self.vars_form.removeRow(0)
+        self._form_generation += 1
+        self._release_rows()
         self.variables.clear()
+        self._literals = ()
+        self._getters = ()
+        self._slots_by_name = {}
 
         if not self.template_text:
             return
 
-        template_rel = self.template_path.relative_to(self.base_path / "prompts")
-        local_base = self.base_path / "prompt-vars" / template_rel.with_suffix("")
-
-        for match in TOKEN_RE.finditer(self.template_text):
-            kind: str
-            raw: str
-            if match.group("gd"):
-                kind = "global"
-                raw = match.group("gd")
-            elif match.group("ld"):
-                kind = "local"
-                raw = match.group("ld")
-            elif match.group("short"):
-                kind = "short"
-                raw = match.group("short")
-            else:
-                kind = "long"
-                raw = match.group("long")
+        template_rel = self.template_path.relative_to(self._prompts_root)
+        local_base = self._prompt_vars_root / template_rel.with_suffix("")
 
+        template = normalize_newlines(self.template_text)
+        literals: list[str] = []
+        slot_names: list[str] = []
+        pos = 0
+        for kind, raw, start, end in scan_tokens(template):
             name, default = (raw.split("|", 1) + [None])[:2]
 
+            literals.append(template[pos:start])
+            self._slots_by_name.setdefault(name, []).append(len(slot_names))
+            slot_names.append(name)
+            pos = end
+
             file_path: Path | None = None
             if kind == "global":
-                file_path = self.base_path / "vars" / f"{name}.yaml"
+                file_path = self._vars_root / f"{name}.yaml"
             elif kind == "local":
                 file_path = local_base / f"{name}.yaml"
 
@@ -211,90 +372,201 @@ class MainWindow(QMainWindow):
             self.variables[name] = var
 
             if kind in {"global", "local"}:
-                combo = QComboBox()
-                options = self._load_options(file_path, default)
-                if options:
-                    combo.addItems([t for t, _ in options])
-                    if default:
-                        values = [v for _, v in options]
-                        if default in values:
-                            combo.setCurrentIndex(values.index(default))
-                    combo.currentIndexChanged.connect(self.render_prompt)
-                else:
-                    combo.addItem("Missing file")
-                    combo.setEnabled(False)
+                combo = self._take_widget("combo")
+                combo.setEnabled(False)
                 var.widget = combo
                 self.vars_form.addRow(name, combo)
+                cached, options = fresh_options(file_path)
+                if cached:
+                    self._fill_combo(var, options)
+                else:
+                    combo.addItem("Loading...")
+                    runnable = JobRunnable(
+                        cached_options, file_path, generation=self._form_generation
+                    )
+                    runnable.signals.finished.connect(
+                        partial(self._on_options_loaded, name), Qt.QueuedConnection
+                    )
+                    self._thread_pool.start(runnable)
             elif kind == "short":
-                line = QLineEdit()
+                line = self._take_widget("line")
                 if default:
                     line.setText(default)
-                line.textChanged.connect(self.render_prompt)
+                line.textChanged.connect(partial(self.schedule_render, name))
                 var.widget = line
                 self.vars_form.addRow(name, line)
             else:
-                text = QTextEdit()
-                text.setFixedHeight(80)
+                text = self._take_widget("text")
                 if default:
                     text.setPlainText(default)
-                text.textChanged.connect(self.render_prompt)
+                text.textChanged.connect(partial(self.schedule_render, name))
                 var.widget = text
                 self.vars_form.addRow(name, text)
 
-    def _load_options(
-        self, file_path: Path | None, default: str | None = None
-    ) -> list[tuple[str, str]]:
-        if not file_path or not file_path.exists():
-            return []
-        try:
-            data = yaml.safe_load(file_path.read_text(encoding="utf-8")) or {}
-        except Exception:
-            return []
-        result = []
-        for item in data.get("options", []):
-            title = str(item.get("title", ""))
-            value = str(item.get("value", title))
-            result.append((title, value))
-        if default and default not in [v for _, v in result]:
-            result.insert(0, (default, default))
-        return result
+        literals.append(template[pos:])
+        getters = {name: self._make_getter(var) for name, var in self.variables.items()}
+        self._literals = tuple(literals)
+        self._getters = tuple(getters[name] for name in slot_names)
+
+    def _take_widget(self, kind: str) -> QWidget:
+        """Return a pooled input widget of ``kind``, creating one if needed."""
+        pool = self._widget_pool[kind]
+        if pool:
+            widget = pool.pop()
+            widget.show()
+            return widget
+        if kind == "combo":
+            return QComboBox()
+        if kind == "line":
+            return QLineEdit()
+        text = QTextEdit()
+        text.setFixedHeight(80)
+        return text
+
+    def _release_rows(self) -> None:
+        """Empty the variables form, returning its input widgets to the pool."""
+        while self.vars_form.rowCount():
+            row = self.vars_form.takeRow(self.vars_form.rowCount() - 1)
+            label = row.labelItem.widget() if row.labelItem else None
+            if label is not None:
+                label.deleteLater()
+            widget = row.fieldItem.widget() if row.fieldItem else None
+            if widget is None:
+                continue
+            widget.blockSignals(True)
+            if isinstance(widget, QComboBox):
+                kind, signal = "combo", widget.currentIndexChanged
+                widget.clear()
+                widget.setEnabled(True)
+            elif isinstance(widget, QLineEdit):
+                kind, signal = "line", widget.textChanged
+                # Unlike clear(), setText() also drops the undo history.
+                widget.setText("")
+            else:
+                kind, signal = "text", widget.textChanged
+                widget.clear()
+            widget.blockSignals(False)
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # nothing connected, e.g. a "Missing file" combo
+            widget.hide()
+            self._widget_pool[kind].append(widget)
+
+    def _on_options_loaded(
+        self, name: str, generation: int, options: list[tuple[str, str]] | None
+    ) -> None:
+        if generation != self._form_generation:
+            return  # the form was rebuilt while the file was loading
+        self._fill_combo(self.variables[name], options)
+        self.schedule_render(name)
+
+    def _fill_combo(
+        self, var: Variable, options: list[tuple[str, str]] | None
+    ) -> None:
+        name = var.name
+        combo = var.widget
+        options = with_default(options, var.default)
+        combo.clear()
+        if options:
+            for title, value in options:
+                combo.addItem(title, normalize_newlines(value))
+            if var.default:
+                index = combo.findData(var.default)
+                if index >= 0:
+                    combo.setCurrentIndex(index)
+            combo.setEnabled(True)
+            combo.currentIndexChanged.connect(partial(self.schedule_render, name))
+        else:
+            combo.addItem("Missing file")
 
     # ------------------------------------------------------------------
     # Rendering and actions
 
+    def schedule_render(self, name: str, *_args: object) -> None:
+        """Mark ``name`` as changed and coalesce bursts of edits."""
+        # Signal arguments are dropped so they never reach QTimer.start(msec).
+        self._dirty_vars.add(name)
+        self._render_timer.start()
+
     def render_prompt(self) -> None:
+        self._render_timer.stop()
+        self._dirty_vars.clear()
+        self._slot_positions = []
         if not self.template_text:
+            self._rendered = []
+            self._last_rendered = ""
             self.prompt_edit.clear()
             return
 
-        rendered: list[str] = []
-        pos = 0
-        for match in TOKEN_RE.finditer(self.template_text):
-            rendered.append(self.template_text[pos:match.start()])
-            name = match.group("gd") or match.group("ld") or match.group("short") or match.group("long")
-            value = self._var_value(name)
-            rendered.append(value)
-            pos = match.end()
-        rendered.append(self.template_text[pos:])
-        self.prompt_edit.setPlainText("".join(rendered))
-
-    def _var_value(self, name: str) -> str:
-        var = self.variables.get(name)
-        if not var or not var.widget:
-            return ""
-        if isinstance(var.widget, QComboBox):
-            options = self._load_options(var.file_path, var.default)
-            idx = var.widget.currentIndex()
-            if 0 <= idx < len(options):
-                return options[idx][1]
-            return var.default or ""
-        if isinstance(var.widget, QLineEdit):
-            text = var.widget.text()
-            return text if text else (var.default or "")
-        if isinstance(var.widget, QTextEdit):
-            text = var.widget.toPlainText()
-            return text if text else (var.default or "")
-        return ""
+        rendered: list[str] = [""] * (2 * len(self._getters) + 1)
+        rendered[0::2] = self._literals
+        rendered[1::2] = [getter() for getter in self._getters]
+        self._rendered = rendered
+        self._last_rendered = "".join(rendered)
+        self.prompt_edit.setPlainText(self._last_rendered)
+
+        offsets = []
+        offset = 0
+        for segment in rendered:
+            offsets.append(offset)
+            offset += _qt_len(segment)
+        self._slot_positions = [
+            (offsets[i], offsets[i] + _qt_len(rendered[i]))
+            for i in range(1, len(rendered), 2)
+        ]
+
+    def _flush_render(self) -> None:
+        """Replace only the slots of variables changed since the last render."""
+        self._render_timer.stop()
+        dirty, self._dirty_vars = self._dirty_vars, set()
+        if not self._slot_positions:
+            self.render_prompt()
+            return
+
+        cursor = QTextCursor(self.prompt_edit.document())
+        cursor.beginEditBlock()
+        for name in dirty:
+            slots = self._slots_by_name.get(name)
+            if not slots:
+                continue
+            value = self._getters[slots[0]]()
+            length = _qt_len(value)
+            for slot in slots:
+                start, end = self._slot_positions[slot]
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(value)
+                self._rendered[2 * slot + 1] = value
+                self._last_rendered = None
+                delta = length - (end - start)
+                self._slot_positions[slot] = (start, start + length)
+                if delta:
+                    for later in range(slot + 1, len(self._slot_positions)):
+                        later_start, later_end = self._slot_positions[later]
+                        self._slot_positions[later] = (
+                            later_start + delta,
+                            later_end + delta,
+                        )
+        cursor.endEditBlock()
+
+    @staticmethod
+    def _make_getter(var: Variable) -> Callable[[], str]:
+        """Return a callable producing the current rendered value of ``var``."""
+        widget = var.widget
+        default = var.default or ""
+        if var.kind in {"global", "local"}:
+            current_data = widget.currentData
+
+            def combo_value() -> str:
+                # Placeholder items ("Loading...", "Missing file") carry no data.
+                data = current_data()
+                return data if data is not None else default
+
+            return combo_value
+        get_text = widget.text if var.kind == "short" else widget.toPlainText
+        # Pasted text may carry "\r\n", which the prompt view stores as "\n".
+        return lambda: normalize_newlines(get_text()) or default
 
     def save_prompt(self) -> None:
         """Save the template to disk and resync variables."""
@@ -302,16 +574,21 @@ class MainWindow(QMainWindow):
             return
         text = self.template_edit.toPlainText()
         self.template_path.write_text(text, encoding="utf-8")
+        self._template_cache.pop(str(self.template_path), None)
         self.template_text = text
         self.resync()
         self.build_variables()
         self.render_prompt()
-        self.statusBar().showMessage("Saved", 2000)
+        self._status_bar.showMessage("Saved", 2000)
 
     def copy_prompt(self) -> None:
-        text = self.prompt_edit.toPlainText()
-        QApplication.clipboard().setText(text)
-        self.statusBar().showMessage(f"Copied {len(text)} chars", 2000)
+        if self._render_timer.isActive():
+            self._flush_render()
+        if self._last_rendered is None:
+            self._last_rendered = "".join(self._rendered)
+        text = self._last_rendered
+        self._clipboard.setText(text)
+        self._status_bar.showMessage(f"Copied {len(text)} chars", 2000)
 
     def closeEvent(self, event: QCloseEvent) -> None:  # pragma: no cover - GUI
         event.accept()
@@ -0,0 +1,114 @@
+"""Variable option files for Skellaprompter."""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: no cover - depends on libyaml availability
+    from yaml import SafeLoader as _SafeLoader
+
+_YAML_CACHE: OrderedDict[Path, tuple[float, int, list[tuple[str, str]] | None]] = OrderedDict()
+_YAML_CACHE_LOCK = threading.Lock()
+_MAX = 100
+
+
+def parse_options_file(path: Path) -> list[tuple[str, str]] | None:
+    """Parse a YAML options file into ``(title, value)`` pairs.
+
+    Returns ``None`` if the file cannot be read or parsed, or does not have
+    the ``options: [{title, value}, ...]`` layout.
+    """
+    try:
+        data = yaml.load(path.read_bytes(), Loader=_SafeLoader) or {}
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    items = data.get("options") or []
+    if not isinstance(items, list):
+        return None
+    result = []
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        title = str(item.get("title", ""))
+        value = str(item.get("value", title))
+        result.append((title, value))
+    return result
+
+
+def _cache_lookup(
+    path: Path, st: os.stat_result
+) -> tuple[bool, list[tuple[str, str]] | None]:
+    with _YAML_CACHE_LOCK:
+        cached = _YAML_CACHE.get(path)
+        if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+            _YAML_CACHE.move_to_end(path)
+            return True, cached[2]
+    return False, None
+
+
+def cached_options(path: Path) -> list[tuple[str, str]] | None:
+    """Return parsed options for ``path``, reusing the cache while unchanged.
+
+    Returns ``None`` if the file is missing or unreadable.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    hit, options = _cache_lookup(path, st)
+    if hit:
+        return options
+    options = parse_options_file(path)
+    with _YAML_CACHE_LOCK:
+        _YAML_CACHE[path] = (st.st_mtime, st.st_size, options)
+        if len(_YAML_CACHE) > _MAX:
+            _YAML_CACHE.popitem(last=False)
+    return options
+
+
+def fresh_options(path: Path) -> tuple[bool, list[tuple[str, str]] | None]:
+    """Return ``(True, options)`` if ``path`` needs no parsing, else ``(False, None)``.
+
+    A missing file is answered as ``(True, None)``; a file that changed since
+    it was cached, or was never cached, has to go through ``cached_options``.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return True, None
+    return _cache_lookup(path, st)
+
+
+def preload_options(root: str) -> None:
+    """Parse every ``*.yaml`` file directly inside ``root`` into the cache."""
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.name.endswith(".yaml") and entry.is_file():
+                cached_options(Path(entry.path))
+
+
+def with_default(
+    options: list[tuple[str, str]] | None, default: str | None = None
+) -> list[tuple[str, str]]:
+    """Return ``options`` with ``default`` prepended unless it is already a value.
+
+    The returned list may be the cached one itself; callers must not mutate it.
+    """
+    if options is None:
+        return []
+    if default and all(value != default for _, value in options):
+        return [(default, default), *options]
+    return options
@@ -0,0 +1,72 @@
+"""Template token scanning for Skellaprompter."""
+
+from __future__ import annotations
+
+import re
+from typing import Iterator
+
+# Locates the next opening delimiter; "[[[" is listed before "[[" so the
+# longer opener wins at the same position.
+_OPEN_RE = re.compile(r"\{\{|<<|\[\[\[|\[\[")
+
+# Opener -> (closer, character the body may not contain, kind). A body always
+# ends at the first character of its closer, so that character never needs a
+# separate check.
+_DELIMITERS = {
+    "{{": ("}}", "{", "global"),
+    "<<": (">>", "<", "local"),
+    "[[[": ("]]]", None, "long"),
+    "[[": ("]]", None, "short"),
+}
+
+
+def scan_tokens(text: str) -> Iterator[tuple[str, str, int, int]]:
+    """Yield ``(kind, raw, start, end)`` for each token in ``text``.
+
+    ``raw`` is the token body including any ``|default`` suffix. A ``[[[``
+    that does not close as ``]]]`` is never read as a ``[[`` token; the scan
+    resumes one character later instead.
+
+    Runs in linear time: only the opening delimiter is found with a regex,
+    and closers come from a per-character cache of ``str.find`` results that
+    only ever moves forward, so unclosed openers cannot trigger rescans.
+    """
+    # Next position of each delimiter character at or after the last lookup,
+    # or -1 once it no longer occurs. Lookups never move backwards.
+    next_pos: dict[str, int] = {}
+
+    def find(char: str, start: int) -> int:
+        found = next_pos.get(char)
+        if found is None or 0 <= found < start:
+            found = next_pos[char] = text.find(char, start)
+        return found
+
+    pos = 0
+    while True:
+        match = _OPEN_RE.search(text, pos)
+        if match is None:
+            return
+        start, body_start = match.span()
+        closer, forbidden, kind = _DELIMITERS[match.group()]
+        body_end = find(closer[0], body_start)
+        if (
+            body_end > body_start
+            and text.startswith(closer, body_end)
+            and (forbidden is None or not 0 <= find(forbidden, body_start) < body_end)
+        ):
+            end = body_end + len(closer)
+            yield kind, text[body_start:body_end], start, end
+            pos = end
+        else:
+            pos = start + 1
+
+
+def normalize_newlines(text: str) -> str:
+    """Return ``text`` with ``\\r\\n`` and lone ``\\r`` replaced by ``\\n``.
+
+    QTextDocument turns each of these into a single block separator, so only
+    normalised text has the same length in the prompt view as in Python.
+    """
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
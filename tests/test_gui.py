@@ -0,0 +1,70 @@
+"""Tests for the in-place prompt updates of the main window."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+try:
+    from PyQt5.QtCore import QThreadPool
+    from PyQt5.QtWidgets import QApplication
+except ImportError:  # pragma: no cover - depends on the environment
+    QApplication = None
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class PromptSlotsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        from skellaprompter import gui
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        base = Path(tmp.name)
+        (base / "prompts").mkdir()
+        (base / "vars").mkdir()
+        (base / "prompts" / "p.md").write_text("", encoding="utf-8")
+        options = base / "vars" / "Place.yaml"
+        options.write_text(
+            'options:\n  - title: Two lines\n    value: "x\\r\\ny"\n', encoding="utf-8"
+        )
+        # Warm the cache so the combo is filled synchronously.
+        gui.cached_options(options)
+
+        self.window = gui.MainWindow(base)
+        self.addCleanup(QThreadPool.globalInstance().waitForDone)
+        self.window.template_path = base / "prompts" / "p.md"
+
+    def load(self, text):
+        self.window.template_text = text
+        self.window.build_variables()
+        self.window.render_prompt()
+
+    def expected(self):
+        parts = []
+        for literal, getter in zip(self.window._literals, self.window._getters):
+            parts += [literal, getter()]
+        parts.append(self.window._literals[-1])
+        return "".join(parts)
+
+    def assert_in_sync(self):
+        self.assertEqual(self.window.prompt_edit.toPlainText(), self.expected())
+        self.window.copy_prompt()
+        self.assertEqual(self.window._last_rendered, self.expected())
+
+    def test_crlf_values_keep_slot_offsets(self):
+        self.load("{{Place}} [[note]] and [[note]] [[tail]]\r\nend")
+        self.assert_in_sync()
+
+        self.window.variables["note"].widget.setText("p\r\nq")
+        self.window._flush_render()
+        self.assert_in_sync()
+
+        self.window.variables["tail"].widget.setText("t")
+        self.window._flush_render()
+        self.assert_in_sync()
+        self.assertNotIn("\r", self.window.prompt_edit.toPlainText())
@@ -0,0 +1,112 @@
+"""Tests for variable option files and their cache."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from skellaprompter import options
+from skellaprompter.options import (
+    cached_options,
+    fresh_options,
+    parse_options_file,
+    preload_options,
+    with_default,
+)
+
+
+class OptionsTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        options._YAML_CACHE.clear()
+        self.addCleanup(options._YAML_CACHE.clear)
+
+    def write(self, text, name="opts.yaml"):
+        path = self.root / name
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+class ParseOptionsFileTest(OptionsTestCase):
+    def test_titles_and_values(self):
+        path = self.write("options:\n  - title: A\n    value: a\n  - title: B\n")
+        self.assertEqual(parse_options_file(path), [("A", "a"), ("B", "B")])
+
+    def test_malformed_files_are_none(self):
+        for text in (
+            "options: [",
+            "- a\n- b\n",
+            "just text",
+            "options: not a list\n",
+            "options: {title: A}\n",
+            "options:\n  - A\n",
+        ):
+            self.assertIsNone(parse_options_file(self.write(text)), text)
+
+    def test_missing_file_is_none(self):
+        self.assertIsNone(parse_options_file(self.root / "missing.yaml"))
+
+    def test_empty_options(self):
+        for text in ("", "options:\n", "options: []\n"):
+            self.assertEqual(parse_options_file(self.write(text)), [], text)
+
+
+class WithDefaultTest(unittest.TestCase):
+    def test_default_is_prepended_to_empty_options(self):
+        self.assertEqual(with_default([], "x"), [("x", "x")])
+
+    def test_default_already_present_is_not_repeated(self):
+        opts = [("A", "a"), ("X", "x")]
+        self.assertIs(with_default(opts, "x"), opts)
+
+    def test_missing_file_has_no_options(self):
+        self.assertEqual(with_default(None, "x"), [])
+
+
+class OptionsCacheTest(OptionsTestCase):
+    def test_unchanged_file_is_a_cache_hit(self):
+        path = self.write("options:\n  - title: A\n")
+        self.assertEqual(fresh_options(path), (False, None))
+        first = cached_options(path)
+        self.assertEqual(first, [("A", "A")])
+        self.assertEqual(fresh_options(path), (True, first))
+        self.assertIs(cached_options(path), first)
+
+    def test_size_change_is_reparsed(self):
+        path = self.write("options:\n  - title: A\n")
+        stat = path.stat()
+        cached_options(path)
+        self.write("options:\n  - title: AB\n")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(fresh_options(path), (False, None))
+        self.assertEqual(cached_options(path), [("AB", "AB")])
+
+    def test_mtime_change_is_reparsed(self):
+        path = self.write("options:\n  - title: A\n")
+        stat = path.stat()
+        cached_options(path)
+        self.write("options:\n  - title: B\n")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(fresh_options(path), (False, None))
+        self.assertEqual(cached_options(path), [("B", "B")])
+
+    def test_missing_file(self):
+        path = self.root / "missing.yaml"
+        self.assertEqual(fresh_options(path), (True, None))
+        self.assertIsNone(cached_options(path))
+
+    def test_cache_is_bounded(self):
+        paths = [self.write("", f"{i}.yaml") for i in range(options._MAX + 1)]
+        for path in paths:
+            cached_options(path)
+        self.assertEqual(len(options._YAML_CACHE), options._MAX)
+        self.assertEqual(fresh_options(paths[0]), (False, None))
+
+    def test_preload_fills_the_cache(self):
+        path = self.write("options:\n  - title: A\n")
+        self.write("ignored", "notes.txt")
+        preload_options(str(self.root))
+        self.assertEqual(fresh_options(path), (True, [("A", "A")]))
+        self.assertEqual(list(options._YAML_CACHE), [path])
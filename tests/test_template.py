@@ -0,0 +1,86 @@
+"""Tests for template token scanning."""
+
+import random
+import re
+import unittest
+
+from skellaprompter.template import normalize_newlines, scan_tokens
+
+# Regex form of the template syntax, used as an oracle for the scanner.
+TOKEN_RE = re.compile(
+    r"\{\{(?P<global>[^{}]+)\}\}"
+    r"|<<(?P<local>[^<>]+)>>"
+    r"|\[\[\[(?P<long>[^\]]+)\]\]\]"
+    r"|\[\[(?!\[)(?P<short>[^\]]+)\]\]"
+)
+
+
+def regex_tokens(text):
+    return [
+        (m.lastgroup, m.group(m.lastgroup), m.start(), m.end())
+        for m in TOKEN_RE.finditer(text)
+    ]
+
+
+class ScanTokensTest(unittest.TestCase):
+    def test_kinds_and_defaults(self):
+        text = "Hi {{Character|John}} in <<Location>>: [[note]] [[[story|Once]]]!"
+        self.assertEqual(
+            [(kind, raw) for kind, raw, _, _ in scan_tokens(text)],
+            [
+                ("global", "Character|John"),
+                ("local", "Location"),
+                ("short", "note"),
+                ("long", "story|Once"),
+            ],
+        )
+
+    def test_positions_cover_the_token(self):
+        text = "a {{b}} c"
+        [(_, _, start, end)] = scan_tokens(text)
+        self.assertEqual(text[start:end], "{{b}}")
+
+    def test_invalid_bodies_are_skipped(self):
+        self.assertEqual(list(scan_tokens("{{}} <<>> [[]] {{a{b}} <<a<b>>")), [])
+
+    def test_nested_opener_restarts_the_token(self):
+        self.assertEqual(
+            list(scan_tokens("{{a{{b}} <<a<<b>>")),
+            [("global", "b", 3, 8), ("local", "b", 12, 17)],
+        )
+
+    def test_short_and_long_disambiguation(self):
+        cases = {
+            "[[x]]": [("short", "x", 0, 5)],
+            "[[[x]]]": [("long", "x", 0, 7)],
+            # A triple opener without a triple closer is a literal "[" followed
+            # by a short token, not a short token whose body starts with "[".
+            "[[[x]]": [("short", "x", 1, 6)],
+            "[[[[x]]]": [("long", "[x", 0, 8)],
+            "[[x]]]": [("short", "x", 0, 5)],
+        }
+        for text, expected in cases.items():
+            self.assertEqual(list(scan_tokens(text)), expected, text)
+
+    def test_unclosed_openers_yield_nothing(self):
+        for text in ("{{" * 20000, "<<" * 20000, "[[[[" * 10000, "{" * 40000 + "}}"):
+            self.assertEqual(list(scan_tokens(text)), [])
+
+    def test_matches_regex_oracle(self):
+        rng = random.Random(1)
+        for _ in range(20000):
+            text = "".join(rng.choice("{}<>[]a|") for _ in range(rng.randint(0, 16)))
+            self.assertEqual(list(scan_tokens(text)), regex_tokens(text), text)
+
+
+class NormalizeNewlinesTest(unittest.TestCase):
+    def test_carriage_returns_become_newlines(self):
+        self.assertEqual(normalize_newlines("a\r\nb\rc\nd\r\r\n"), "a\nb\nc\nd\n\n")
+
+    def test_text_without_carriage_returns_is_returned_as_is(self):
+        text = "a\nb"
+        self.assertIs(normalize_newlines(text), text)
+
+
+if __name__ == "__main__":
+    unittest.main()